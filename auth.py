@@ -9,9 +9,14 @@ Data: 02 de fevereiro de 2026
 Desenvolvido por: PBrandão
 """
 
+import os
+import hmac
+import logging
 from datetime import timedelta
 from functools import wraps
-from flask import session, redirect, url_for, jsonify
+from flask import g, session, redirect, url_for, jsonify
+
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # CONFIGURAÇÃO - LÊ DE config.py (PRIORIDADE TOTAL)
@@ -25,8 +30,7 @@ try:
     USE_CONFIG = True
 except (ImportError, AttributeError) as e:
     # Fallback APENAS se config.py não existir
-    print(f"⚠️  Warning: config.py não carregado ({e})")
-    print("   Usando credenciais de fallback...")
+    logger.warning(f"config.py não carregado ({e}) - usando credenciais de fallback (variáveis de ambiente)")
     ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
     USE_CONFIG = False
@@ -51,22 +55,39 @@ class AuthManager:
         Valida credenciais contra config.ADMIN_USERNAME/ADMIN_PASSWORD
         
         Retorna: True se credenciais corretas, False caso contrário
+        
+        Comparação em tempo constante (hmac.compare_digest) sobre bytes UTF-8;
+        '&' em vez de 'and' para não curto-circuitar no username.
         """
-        return (username == ADMIN_USERNAME and password == ADMIN_PASSWORD)
+        if not ADMIN_USERNAME or not ADMIN_PASSWORD:
+            return False
+        try:
+            username_ok = hmac.compare_digest(username.encode('utf-8'), ADMIN_USERNAME.encode('utf-8'))
+            password_ok = hmac.compare_digest(password.encode('utf-8'), ADMIN_PASSWORD.encode('utf-8'))
+        except (AttributeError, TypeError):
+            return False
+        return username_ok & password_ok
 
     @staticmethod
     def login(username: str) -> None:
-        """Define utilizador na sessão (suporta modo novo e compatível)."""
+        """Define utilizador na sessão.
+        
+        Só escreve session['user']; as chaves do modo compatível
+        (authenticated/username) continuam a ser lidas em sessões antigas,
+        mas já não são gravadas para manter o cookie pequeno.
+        """
         
-        # Novo modo (session['user'])
         session['user'] = username
         
-        # Modo compatível (session['authenticated'] + session['username'])
-        session['authenticated'] = True
-        session['username'] = username
+        # Limpa chaves do modo compatível de uma sessão anterior
+        session.pop('authenticated', None)
+        session.pop('username', None)
         
         # Configura sessão como permanente (7 dias por padrão)
         session.permanent = True
+        
+        # Invalida resultado memorizado de is_authenticated()
+        g.pop('_auth_cached', None)
 
     @staticmethod
     def logout() -> None:
@@ -74,6 +95,7 @@ class AuthManager:
         session.pop('user', None)
         session.pop('authenticated', None)
         session.pop('username', None)
+        g.pop('_auth_cached', None)
 
     @staticmethod
     def is_authenticated() -> bool:
@@ -83,16 +105,17 @@ class AuthManager:
         Suporta:
         - session['user'] (modo novo)
         - session['authenticated'] (modo compatível)
-        """
-        # Novo modo
-        if 'user' in session and session['user'] is not None:
-            return True
         
-        # Modo compatível (antigo)
-        if session.get('authenticated', False):
-            return True
+        O resultado é memorizado em flask.g durante o pedido.
+        """
+        cached = g.get('_auth_cached')
+        if cached is not None:
+            return cached
         
-        return False
+        # Novo modo ou modo compatível (antigo)
+        result = session.get('user') is not None or bool(session.get('authenticated', False))
+        g._auth_cached = result
+        return result
 
     @staticmethod
     def get_current_user() -> str:
@@ -146,15 +169,3 @@ def api_login_required(view_func):
             }), 401
         return view_func(*args, **kwargs)
     return wrapper
-
-
-# ============================================================================
-# INICIALIZAÇÃO - LOG DE INFORMAÇÃO
-# ============================================================================
-
-if __name__ != "__main__":
-    # Apenas quando importado (não quando executado diretamente)
-    print(f"✅ auth.py carregado (modo: {'config' if USE_CONFIG else 'fallback'})")
-    print(f"   ADMIN_USERNAME: {ADMIN_USERNAME}")
-    if not USE_CONFIG:
-        print(f"   ADMIN_PASSWORD: {ADMIN_PASSWORD} (FALLBACK - Use config.py!)")
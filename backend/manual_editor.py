@@ -10,13 +10,19 @@ Desenvolvido por: PBrandão
 """
 
 import os
+import re
 import logging
+from bisect import bisect_right
 from datetime import datetime, date, timedelta
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 from icalendar import Calendar, Event
-import pytz
-import uuid
+from icalendar.prop import vCategory, vDDDTypes, vText
+
+from backend.ics import ICSHandler, atomic_write, iter_vevent_blocks, map_ics_file
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +30,10 @@ logger = logging.getLogger(__name__)
 REPO_PATH = Path(__file__).parent.parent
 IMPORT_CALENDAR_PATH = REPO_PATH / 'import_calendar.ics'
 MANUAL_CALENDAR_PATH = REPO_PATH / 'manual_calendar.ics'
-PT_TZ = pytz.timezone('Europe/Lisbon')
+PT_TZ = ZoneInfo('Europe/Lisbon')
+
+# Última linha de um VCALENDAR serializado pelo icalendar
+VCALENDAR_END = b'END:VCALENDAR\r\n'
 
 # COLORMAP - CORRIGIDA v1.2
 COLORMAP = {
@@ -36,20 +45,191 @@ COLORMAP = {
 }
 
 
+@lru_cache(maxsize=64)
+def _categories_ical_text(cats: Tuple[str, ...]) -> str:
+    """Texto iCalendar de uma lista de categorias (poucas distintas, memoizado)."""
+    return vCategory(list(cats)).to_ical().decode('utf-8', 'replace')
+
+
 def convert_categories_to_string(categories):
     """Converte objeto vCategory para string."""
     if not categories:
         return ''
+    if isinstance(categories, vCategory):
+        return _categories_ical_text(tuple(categories.cats))
+    if isinstance(categories, (bytes, bytearray)):
+        return categories.decode('utf-8', 'replace')
+    return str(categories)
+
+
+# Categorias com efeito no calendário, por ordem de precedência quando uma
+# string de categorias contém várias (MANUAL-REMOVE ganha sempre)
+_OVERLAY_KINDS = ('MANUAL-REMOVE', 'RESERVATION', 'MANUAL-BLOCK', 'PREP-TIME')
+_OVERLAY_KIND_RE = re.compile('|'.join(_OVERLAY_KINDS))
+_OVERLAY_COLORS = {
+    'RESERVATION': COLORMAP.get('reserved'),
+    'MANUAL-BLOCK': COLORMAP.get('manual-block'),
+    'PREP-TIME': COLORMAP.get('prep-time'),
+}
+# (categoria, descrição, uid, cor) dos dias sem evento
+_AVAILABLE_OWNER = ('AVAILABLE', 'Disponível', '', COLORMAP.get('available', '#4dd9ff'))
+
+
+@lru_cache(maxsize=256)
+def _overlay_kind(categories: str) -> Optional[str]:
+    """Categoria dominante numa string de categorias, ou None.
+
+    Recebe o valor tal como vem do evento: a normalização (maiúsculas, sem
+    espaços) fica em cache junto com o resultado, uma vez por string distinta.
+    """
+    found = set(_OVERLAY_KIND_RE.findall(categories.upper().strip()))
+    for kind in _OVERLAY_KINDS:
+        if kind in found:
+            return kind
+    return None
+
+
+@lru_cache(maxsize=2)
+def _iso_day_keys(start_ord: int, num_days: int) -> Tuple[str, ...]:
+    """Datas ISO dos num_days dias a partir do ordinal start_ord.
+
+    A janela só muda uma vez por dia; as chaves são reaproveitadas entre
+    chamadas a process_calendar_data.
+    """
+    return tuple(date.fromordinal(start_ord + i).isoformat() for i in range(num_days))
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_date(value: str) -> date:
+    """'YYYY-MM-DD' → date, com a validação estrita de strptime.
+
+    A forma canónica vai direta a date.fromisoformat (C); o resto, incluindo
+    '2026-2-5' que o strptime aceita, passa pelo strptime. Memoizado: as
+    mesmas datas repetem-se entre pedidos e eventos.
+    """
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+@lru_cache(maxsize=4096)
+def _iso_to_date(value: str) -> date:
+    """'YYYY-MM-DD[THH:MM:SS...]' → date, a partir dos primeiros 10 caracteres."""
     try:
-        if hasattr(categories, 'to_ical'):
-            result = categories.to_ical()
-            if isinstance(result, bytes):
-                return result.decode('utf-8')
-            return str(result)
-        result = str(categories)
-        return result
-    except:
-        return ''
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return datetime.fromisoformat(value.split('T')[0]).date()
+
+
+@lru_cache(maxsize=1)
+def _manual_calendar_header() -> bytes:
+    """Cabeçalho do manual_calendar.ics, sem eventos nem END:VCALENDAR.
+
+    A saída de save_manual_calendar é idêntica a cal.to_ical() com os
+    eventos adicionados.
+    """
+    cal = Calendar()
+    cal.add('prodid', '-//Rental Manual Calendar//PT')
+    cal.add('version', '2.0')
+    cal.add('calscale', 'GREGORIAN')
+    cal.add('x-wr-calname', 'Manual Calendar')
+    cal.add('x-wr-timezone', 'Europe/Lisbon')
+    return cal.to_ical()[:-len(VCALENDAR_END)]
+
+
+def _event_template(kind: str, now: datetime) -> Event:
+    """Modelo dos eventos manuais de uma categoria criados num mesmo pedido.
+
+    As propriedades comuns são codificadas uma vez; cada evento parte de uma
+    cópia do modelo em vez de repetir os Event.add().
+    """
+    template = Event()
+    template.add('categories', kind)
+    template.add('created', now)
+    template.add('last-modified', now)
+    template.add('status', 'CONFIRMED')
+    template.add('transp', 'TRANSPARENT')
+    template.add('class', 'PUBLIC')
+    return template
+
+
+# Texto dos eventos manuais por categoria: prefixo do UID, SUMMARY e
+# DESCRIPTION (✅ V1.3: mostram DTSTART a DTEND, como no iCalendar)
+_MANUAL_EVENT_TEXT = {
+    'MANUAL-BLOCK': ('manual-block', 'Bloqueio Manual de {} a {}', 'Data Bloqueada Manualmente ({} a {})'),
+    'MANUAL-REMOVE': ('manual-remove', 'Remoção Manual de {} a {}', 'Data Desbloqueada Manualmente ({} a {})'),
+}
+
+
+def _build_event(kind: str, start: date, end: date, uid_tag: str, template: Event) -> Event:
+    """Cria um evento manual de dia inteiro [start, end) a partir do modelo da categoria."""
+    uid_prefix, summary_fmt, description_fmt = _MANUAL_EVENT_TEXT[kind]
+    start_iso = start.isoformat()
+    end_iso = end.isoformat()
+
+    # Valores já tipados: dispensa a conversão genérica de Event.add()
+    event = template.copy()
+    event['UID'] = vText(f'{uid_prefix}-{uid_tag}-{os.urandom(16).hex()}')
+    event['SUMMARY'] = vText(summary_fmt.format(start_iso, end_iso))
+    event['DESCRIPTION'] = vText(description_fmt.format(start_iso, end_iso))
+    event['DTSTART'] = vDDDTypes(start)
+    event['DTEND'] = vDDDTypes(end)
+    return event
+
+
+def _event_to_dict(component: Event) -> Dict:
+    """Converte um VEVENT da sessão no dict devolvido por load_manual_events()."""
+    dtstart = component.get('DTSTART')
+    dtend = component.get('DTEND')
+
+    dtstart_value = None
+    dtend_value = None
+
+    if dtstart:
+        try:
+            dtstart_value = dtstart.dt.isoformat()
+        except AttributeError:
+            dtstart_value = str(dtstart.dt)
+
+    if dtend:
+        try:
+            dtend_value = dtend.dt.isoformat()
+        except AttributeError:
+            dtend_value = str(dtend.dt)
+
+    return {
+        'uid': str(component.get('UID', '')),
+        'summary': str(component.get('SUMMARY', '')),
+        'dtstart': dtstart_value,
+        'dtend': dtend_value,
+        'description': str(component.get('DESCRIPTION', '')),
+        'categories': convert_categories_to_string(component.get('CATEGORIES')),
+    }
+
+
+# LF sem CR antes: o único caso que a normalização para CRLF tem de alterar
+_BARE_LF_RE = re.compile(rb'(?<!\r)\n')
+
+
+def _crlf_block(block: bytes) -> bytes:
+    """Normaliza um bloco VEVENT em bruto para linhas CRLF (incl. a última)."""
+    # Um único passe; blocos já em CRLF (o normal) nem sequer são copiados
+    block = block.rstrip(b'\r')
+    if _BARE_LF_RE.search(block):
+        block = _BARE_LF_RE.sub(b'\r\n', block)
+    return block + b'\r\n'
+
+
+# Último manual_calendar.ics lido, por (caminho, mtime_ns, tamanho):
+# [blocos, eventos parseados (tuplos _MANUAL_EVENT_KEYS) ou None]. Cada pedido
+# cria um handler novo, mas o ficheiro só é relido e parseado quando muda. As
+# listas são partilhadas entre handlers e nunca alteradas no lugar
+# (clear_events cria uma lista nova); os dicts devolvidos são sempre novos.
+_file_blocks_cache: Dict[Tuple[str, int, int], list] = {}
+_MANUAL_EVENT_KEYS = ('uid', 'summary', 'dtstart', 'dtend', 'description', 'categories')
 
 
 class ManualEditorHandler:
@@ -57,57 +237,74 @@ class ManualEditorHandler:
 
     def __init__(self):
         """Inicializa o handler."""
+        # Eventos lidos do ficheiro: blocos VEVENT em bruto (CRLF), com o
+        # DTSTART 'YYYYMMDD' ao lado — só são parseados quando necessário
+        self._raw_event_blocks: List[Tuple[bytes, bytes]] = []
+        self._file_entry: Optional[list] = None
+        # Eventos criados nesta sessão (objetos icalendar), indexados também
+        # pelo ordinal do DTSTART para clear_events não percorrer a lista
         self.manual_events = []
+        self._manual_by_ord: Dict[int, List[Event]] = {}
+        # Os mesmos eventos já convertidos em dicts, na mesma ordem
+        self._manual_event_dicts: List[Dict] = []
+        # Resultado de load_manual_events(), válido até à próxima alteração
+        self._manual_dicts: Optional[List[Dict]] = None
         self.load_manual_events_into_memory()
 
     def load_manual_events_into_memory(self):
-        """Carrega eventos manuais em memória."""
+        """Carrega eventos manuais em memória (blocos em bruto, sem icalendar)."""
+        self._manual_dicts = None
         try:
-            if Path(MANUAL_CALENDAR_PATH).exists():
-                with open(MANUAL_CALENDAR_PATH, 'rb') as f:
-                    try:
-                        cal = Calendar.from_ical(f.read())
-                        for component in cal.walk():
-                            if component.name == 'VEVENT':
-                                self.manual_events.append(component)
-                        logger.info(f'Carregados {len(self.manual_events)} eventos do manual_calendar.ics')
-                    except Exception as e:
-                        logger.error(f'Erro ao fazer parse do ICS: {e}')
-                        self.manual_events = []
+            self._file_entry = None
+            if MANUAL_CALENDAR_PATH.exists():
+                st = os.stat(MANUAL_CALENDAR_PATH)
+                key = (str(MANUAL_CALENDAR_PATH), st.st_mtime_ns, st.st_size)
+                entry = _file_blocks_cache.get(key)
+                if entry is None:
+                    # Ficheiro mapeado: só os blocos VEVENT são copiados
+                    with map_ics_file(MANUAL_CALENDAR_PATH) as data:
+                        blocks = [
+                            (dtstart, _crlf_block(data[begin:end]))
+                            for begin, end, dtstart, _ in iter_vevent_blocks(data)
+                        ]
+                    entry = [blocks, None]
+                    _file_blocks_cache.clear()
+                    _file_blocks_cache[key] = entry
+                    logger.info(f'Carregados {len(blocks)} eventos do manual_calendar.ics')
+                self._file_entry = entry
+                self._raw_event_blocks = entry[0]
             else:
-                self.manual_events = []
+                self._raw_event_blocks = []
         except Exception as e:
             logger.error(f'Erro ao abrir ficheiro manual_calendar.ics: {e}')
-            self.manual_events = []
+            self._raw_event_blocks = []
+
+    def _append_manual_event(self, event: Event, dtstart: date):
+        """Acrescenta um evento da sessão, mantendo o índice por ordinal."""
+        self.manual_events.append(event)
+        self._manual_by_ord.setdefault(dtstart.toordinal(), []).append(event)
+        self._manual_event_dicts.append(_event_to_dict(event))
+        self._manual_dicts = None
 
     def load_import_events(self) -> List[Dict]:
         """Carrega eventos do import_calendar.ics."""
         events = []
         try:
-            if not Path(IMPORT_CALENDAR_PATH).exists():
+            if not IMPORT_CALENDAR_PATH.exists():
                 logger.warning(f'{IMPORT_CALENDAR_PATH} não encontrado')
                 return events
 
-            with open(IMPORT_CALENDAR_PATH, 'rb') as f:
-                cal = Calendar.from_ical(f.read())
-                for component in cal.walk():
-                    if component.name != 'VEVENT':
-                        continue
-
-                    dtstart = component.get('DTSTART')
-                    dtend = component.get('DTEND')
-                    categories = component.get('CATEGORIES')
-                    categories_str = convert_categories_to_string(categories)
-
-                    event = {
-                        'uid': str(component.get('UID', '')),
-                        'summary': str(component.get('SUMMARY', '')),
-                        'dtstart': dtstart.dt.isoformat() if dtstart else None,
-                        'dtend': dtend.dt.isoformat() if dtend else None,
-                        'description': str(component.get('DESCRIPTION', '')),
-                        'categories': categories_str,
-                    }
-                    events.append(event)
+            # Scanner de linhas do ICSHandler (recai no icalendar se preciso),
+            # com cache por mtime: o ficheiro só é lido quando muda
+            for ev in ICSHandler.read_ics_file(IMPORT_CALENDAR_PATH) or ():
+                events.append({
+                    'uid': ev['uid'],
+                    'summary': ev['summary'],
+                    'dtstart': ev['dtstart'] or None,
+                    'dtend': ev['dtend'] or None,
+                    'description': ev['description'],
+                    'categories': ev['categories'],
+                })
 
             logger.info(f'Carregados {len(events)} eventos do import_calendar.ics')
             return events
@@ -117,49 +314,61 @@ class ManualEditorHandler:
             return events
 
     def load_manual_events(self) -> List[Dict]:
-        """Carrega eventos manuais como dicts."""
+        """Carrega eventos manuais como dicts.
+
+        O resultado fica em cache até os eventos em memória mudarem; cada
+        chamada devolve uma lista nova.
+        """
+        if self._manual_dicts is not None:
+            return list(self._manual_dicts)
+
         events = []
         try:
-            for component in self.manual_events:
-                dtstart = component.get('DTSTART')
-                dtend = component.get('DTEND')
-                categories = component.get('CATEGORIES')
-                categories_str = convert_categories_to_string(categories)
-
-                dtstart_value = None
-                dtend_value = None
-
-                if dtstart:
-                    try:
-                        dtstart_value = dtstart.dt.isoformat()
-                    except:
-                        dtstart_value = str(dtstart.dt)
-
-                if dtend:
-                    try:
-                        dtend_value = dtend.dt.isoformat()
-                    except:
-                        dtend_value = str(dtend.dt)
-
-                event = {
-                    'uid': str(component.get('UID', '')),
-                    'summary': str(component.get('SUMMARY', '')),
-                    'dtstart': dtstart_value,
-                    'dtend': dtend_value,
-                    'description': str(component.get('DESCRIPTION', '')),
-                    'categories': categories_str,
-                }
-                events.append(event)
+            # Blocos lidos do ficheiro: parse só agora, num único passe, e
+            # partilhado com os outros handlers enquanto o ficheiro não mudar
+            if self._raw_event_blocks:
+                entry = self._file_entry
+                untouched = entry is not None and entry[0] is self._raw_event_blocks
+                if untouched and entry[1] is not None:
+                    file_rows = entry[1]
+                else:
+                    parsed = ICSHandler.parse(
+                        b'BEGIN:VCALENDAR\r\n'
+                        + b''.join(block for _, block in self._raw_event_blocks)
+                        + VCALENDAR_END
+                    ) or []
+                    file_rows = [
+                        (
+                            ev['uid'],
+                            ev['summary'],
+                            ev['dtstart'] or None,
+                            ev['dtend'] or None,
+                            ev['description'],
+                            ev['categories'],
+                        )
+                        for ev in parsed
+                    ]
+                    if untouched:
+                        entry[1] = file_rows
+                # A cache guarda tuplos (imutáveis): cada handler recebe dicts próprios
+                events.extend(dict(zip(_MANUAL_EVENT_KEYS, row)) for row in file_rows)
+
+            # Eventos da sessão: convertidos uma vez, ao serem criados
+            events.extend(dict(event) for event in self._manual_event_dicts)
 
             logger.info(f'Processados {len(events)} eventos manuais')
-            return events
+            self._manual_dicts = events
+            return list(events)
 
         except Exception as e:
             logger.error(f'Erro ao carregar manual_events: {e}')
             return events
 
     def process_calendar_data(self, import_events: List[Dict], manual_events: List[Dict]) -> Dict[str, Dict]:
-        """Processa eventos e retorna dados formatados para o calendário."""
+        """Processa eventos e retorna dados formatados para o calendário.
+
+        Os dias com o mesmo evento (ou disponíveis) partilham o mesmo dict.
+        """
         calendar_data = {}
         try:
             today = date.today()
@@ -167,85 +376,106 @@ class ManualEditorHandler:
             end_date = today + timedelta(days=365) # Look forward one year
             logger.info(f'Processando período {start_date} até {end_date}')
 
-            # Inicializar calendário
-            current = start_date
-            while current <= end_date:
-                date_str = current.isoformat()
-                calendar_data[date_str] = {
-                    'category': 'AVAILABLE',
-                    'description': 'Disponível',
-                    'uid': '',
-                    'color': COLORMAP.get('available', '#4dd9ff')
-                }
-                current += timedelta(days=1)
-
-            # Unir e ordenar todos os eventos por data de início
-            all_events = sorted(import_events + manual_events, key=lambda x: x.get('dtstart') or '9999-12-31')
-
-            # Mapeamento de regras de sobreposição
-            # RESERVATION sobrepõe tudo
+            # Chaves ISO dos dias, indexadas pelo ordinal relativo a start_date
+            start_ord = start_date.toordinal()
+            num_days = end_date.toordinal() - start_ord + 1
+            keys = _iso_day_keys(start_ord, num_days)
+
+            # Cada dia guarda só um inteiro: o índice em 'owners' do evento que
+            # o ocupa, ou -1 se disponível. Os dicts são montados no fim.
+            owners: List[Tuple[str, str, str, str]] = []
+            day_owner = [-1] * num_days
+
+            # Unir e ordenar todos os eventos por data de início. Os que começam
+            # depois da janela não a tocam: a bisseção corta-os logo; os que
+            # começam antes podem ainda estender-se para dentro dela
+            decorated = sorted(
+                ((e.get('dtstart') or '9999-12-31', e) for e in import_events + manual_events),
+                key=itemgetter(0)
+            )
+            end_iso = end_date.isoformat()
+            hi = bisect_right([start[:10] for start, _ in decorated], end_iso)
+            all_events = [e for _, e in decorated[:hi]]
+
+            # Regras de sobreposição, pela ordem de início dos eventos:
+            # RESERVATION e MANUAL-BLOCK sobrepõem tudo
             # PREP-TIME só sobrepõe AVAILABLE
-            # MANUAL-BLOCK sobrepõe tudo
             # MANUAL-REMOVE "limpa" para AVAILABLE
-            overlay_priority = {
-                'RESERVATION': 3,
-                'MANUAL-BLOCK': 3,
-                'PREP-TIME': 2,
-                'MANUAL-REMOVE': 1,
-                'AVAILABLE': 0
-            }
+            # A cor de cada tipo vem da tabela _OVERLAY_COLORS
+
+            # Remoções seguidas que se tocam acumulam-se num só troço
+            # [run0, run1), escrito antes da próxima ocupação ou no fim
+            run0 = run1 = 0
 
             for event in all_events:
                 try:
                     dtstart_str = event.get('dtstart')
                     dtend_str = event.get('dtend')
-                    category = event.get('categories', '').upper().strip()
                     summary = event.get('summary', 'Evento')
                     uid = event.get('uid', '')
 
                     if not dtstart_str or not dtend_str:
                         continue
 
-                    dtstart_date = datetime.fromisoformat(dtstart_str.split('T')[0]).date()
-                    dtend_date = datetime.fromisoformat(dtend_str.split('T')[0]).date()
-                    
-                    current = dtstart_date
-                    while current < dtend_date:
-                        date_str = current.isoformat()
-                        if date_str in calendar_data:
-                            # Lógica de sobreposição
-                            current_category = calendar_data[date_str]['category']
-                            
-                            if 'MANUAL-REMOVE' in category:
-                                calendar_data[date_str]['category'] = 'AVAILABLE'
-                                calendar_data[date_str]['description'] = 'Disponível'
-                                calendar_data[date_str]['uid'] = ''
-                                calendar_data[date_str]['color'] = COLORMAP.get('available')
-                            
-                            elif 'RESERVATION' in category:
-                                calendar_data[date_str]['category'] = 'RESERVATION'
-                                calendar_data[date_str]['description'] = summary
-                                calendar_data[date_str]['uid'] = uid
-                                calendar_data[date_str]['color'] = COLORMAP.get('reserved')
-
-                            elif 'MANUAL-BLOCK' in category:
-                                calendar_data[date_str]['category'] = 'MANUAL-BLOCK'
-                                calendar_data[date_str]['description'] = summary
-                                calendar_data[date_str]['uid'] = uid
-                                calendar_data[date_str]['color'] = COLORMAP.get('manual-block')
-
-                            elif 'PREP-TIME' in category and calendar_data[date_str]['category'] == 'AVAILABLE':
-                                calendar_data[date_str]['category'] = 'PREP-TIME'
-                                calendar_data[date_str]['description'] = summary
-                                calendar_data[date_str]['uid'] = uid
-                                calendar_data[date_str]['color'] = COLORMAP.get('prep-time')
-
-                        current += timedelta(days=1)
+                    dtstart_date = _iso_to_date(dtstart_str)
+                    dtend_date = _iso_to_date(dtend_str)
+
+                    # Intervalo [dtstart, dtend) recortado à janela do calendário
+                    i0 = max(0, dtstart_date.toordinal() - start_ord)
+                    i1 = min(num_days, dtend_date.toordinal() - start_ord)
+                    if i0 >= i1:
+                        continue
+
+                    # Lógica de sobreposição, decidida uma vez por evento
+                    kind = _overlay_kind(event.get('categories', ''))
+                    if kind is None:
+                        continue
+
+                    if kind == 'MANUAL-REMOVE':
+                        if run0 < run1 and i0 <= run1:
+                            run0, run1 = min(run0, i0), max(run1, i1)
+                            continue
+                        if run0 < run1:
+                            day_owner[run0:run1] = [-1] * (run1 - run0)
+                        run0, run1 = i0, i1
+                        continue
+
+                    if run0 < run1:
+                        day_owner[run0:run1] = [-1] * (run1 - run0)
+                        run0 = run1 = 0
+
+                    idx = len(owners)
+                    owners.append((kind, summary, uid, _OVERLAY_COLORS[kind]))
+
+                    if kind == 'PREP-TIME':
+                        # Só ocupa dias ainda disponíveis; reescreve o troço
+                        # inteiro de uma vez em vez de indexar dia a dia
+                        day_owner[i0:i1] = [idx if o < 0 else o for o in day_owner[i0:i1]]
+                    else:
+                        day_owner[i0:i1] = [idx] * (i1 - i0)
 
                 except Exception as e:
                     logger.warning(f"Erro ao processar evento: {summary} - {e}")
                     continue
 
+            if run0 < run1:
+                day_owner[run0:run1] = [-1] * (run1 - run0)
+
+            # Montagem única do resultado: um só dict por dono, partilhado
+            # pelos dias que ocupa (tratar como só de leitura); -1 aponta
+            # para o último elemento, o estado "disponível"
+            owners.append(_AVAILABLE_OWNER)
+            cells = [
+                {
+                    'category': cat,
+                    'description': description,
+                    'uid': uid,
+                    'color': color
+                }
+                for cat, description, uid, color in owners
+            ]
+            calendar_data = dict(zip(keys, map(cells.__getitem__, day_owner)))
+
             logger.info(f'Processados {len(calendar_data)} dias')
             return calendar_data
 
@@ -259,36 +489,22 @@ class ManualEditorHandler:
         ✅ V1.3: SUMMARY e DESCRIPTION mostram DTSTART a DTEND (iCalendar)
         """
         try:
+            # Um único instante para todos os eventos criados nesta chamada
+            template = _event_template('MANUAL-BLOCK', datetime.now(PT_TZ))
+            log_each = logger.isEnabledFor(logging.DEBUG)
+
             for date_str in dates:
                 try:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+                    date_obj = _parse_iso_date(date_str)
                 except ValueError:
                     logger.error(f'Formato de data inválido: {date_str}')
                     continue
 
-                # Calcular DTEND (exclusivo)
-                dtend_obj = date_obj + timedelta(days=1)
-
-                # ✅ V1.3: SUMMARY e DESCRIPTION mostram DTSTART a DTEND
-                summary_text = f'Bloqueio Manual de {date_obj.isoformat()} a {dtend_obj.isoformat()}'
-                description_text = f'Data Bloqueada Manualmente ({date_obj.isoformat()} a {dtend_obj.isoformat()})'
-
-                # Criar evento MANUAL-BLOCK
-                event = Event()
-                event.add('uid', f'manual-block-{date_str}-{uuid.uuid4()}')
-                event.add('summary', summary_text)
-                event.add('description', description_text)
-                event.add('dtstart', date_obj)
-                event.add('dtend', dtend_obj)
-                event.add('categories', 'MANUAL-BLOCK')
-                event.add('created', datetime.now(PT_TZ))
-                event.add('last-modified', datetime.now(PT_TZ))
-                event.add('status', 'CONFIRMED')
-                event.add('transp', 'TRANSPARENT')
-                event.add('class', 'PUBLIC')
-
-                self.manual_events.append(event)
-                logger.info(f'MANUAL-BLOCK: {date_str}')
+                # Evento MANUAL-BLOCK de um dia (DTEND exclusivo)
+                event = _build_event('MANUAL-BLOCK', date_obj, date_obj + timedelta(days=1), date_str, template)
+                self._append_manual_event(event, date_obj)
+                if log_each:
+                    logger.debug(f'MANUAL-BLOCK: {date_str}')
 
             logger.info(f'Bloqueadas {len(dates)} datas')
             return True
@@ -308,8 +524,8 @@ class ManualEditorHandler:
         """
         try:
             try:
-                start_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+                start_obj = _parse_iso_date(start_date)
+                end_obj = _parse_iso_date(end_date)
             except ValueError as e:
                 logger.error(f'Formato de data inválido: {start_date} a {end_date}')
                 return False
@@ -317,25 +533,12 @@ class ManualEditorHandler:
             # DTEND é exclusivo, portanto deve ser o dia APÓS o último dia inclusivo
             dtend_obj = end_obj + timedelta(days=1)
 
-            # ✅ V1.3: SUMMARY e DESCRIPTION mostram datas iCalendar (DTSTART a DTEND)
-            summary_text = f'Bloqueio Manual de {start_obj.isoformat()} a {dtend_obj.isoformat()}'
-            description_text = f'Data Bloqueada Manualmente ({start_obj.isoformat()} a {dtend_obj.isoformat()})'
+            template = _event_template('MANUAL-BLOCK', datetime.now(PT_TZ))
 
             # Criar ÚNICO evento MANUAL-BLOCK para todo o intervalo
-            event = Event()
-            event.add('uid', f'manual-block-{start_date}-{end_date}-{uuid.uuid4()}')
-            event.add('summary', summary_text)
-            event.add('description', description_text)
-            event.add('dtstart', start_obj)
-            event.add('dtend', dtend_obj)
-            event.add('categories', 'MANUAL-BLOCK')
-            event.add('created', datetime.now(PT_TZ))
-            event.add('last-modified', datetime.now(PT_TZ))
-            event.add('status', 'CONFIRMED')
-            event.add('transp', 'TRANSPARENT')
-            event.add('class', 'PUBLIC')
-
-            self.manual_events.append(event)
+            event = _build_event('MANUAL-BLOCK', start_obj, dtend_obj, f'{start_date}-{end_date}', template)
+
+            self._append_manual_event(event, start_obj)
             logger.info(f'MANUAL-BLOCK (intervalo): {start_date} a {end_date}')
             return True
 
@@ -349,36 +552,22 @@ class ManualEditorHandler:
         ✅ V1.3: SUMMARY e DESCRIPTION mostram DTSTART a DTEND (iCalendar)
         """
         try:
+            # Um único instante para todos os eventos criados nesta chamada
+            template = _event_template('MANUAL-REMOVE', datetime.now(PT_TZ))
+            log_each = logger.isEnabledFor(logging.DEBUG)
+
             for date_str in dates:
                 try:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+                    date_obj = _parse_iso_date(date_str)
                 except ValueError:
                     logger.error(f'Formato de data inválido: {date_str}')
                     continue
 
-                # Calcular DTEND (exclusivo)
-                dtend_obj = date_obj + timedelta(days=1)
-
-                # ✅ V1.3: SUMMARY e DESCRIPTION mostram DTSTART a DTEND
-                summary_text = f'Remoção Manual de {date_obj.isoformat()} a {dtend_obj.isoformat()}'
-                description_text = f'Data Desbloqueada Manualmente ({date_obj.isoformat()} a {dtend_obj.isoformat()})'
-
-                # Criar evento MANUAL-REMOVE
-                event = Event()
-                event.add('uid', f'manual-remove-{date_str}-{uuid.uuid4()}')
-                event.add('summary', summary_text)
-                event.add('description', description_text)
-                event.add('dtstart', date_obj)
-                event.add('dtend', dtend_obj)
-                event.add('categories', 'MANUAL-REMOVE')
-                event.add('created', datetime.now(PT_TZ))
-                event.add('last-modified', datetime.now(PT_TZ))
-                event.add('status', 'CONFIRMED')
-                event.add('transp', 'TRANSPARENT')
-                event.add('class', 'PUBLIC')
-
-                self.manual_events.append(event)
-                logger.info(f'MANUAL-REMOVE: {date_str}')
+                # Evento MANUAL-REMOVE de um dia (DTEND exclusivo)
+                event = _build_event('MANUAL-REMOVE', date_obj, date_obj + timedelta(days=1), date_str, template)
+                self._append_manual_event(event, date_obj)
+                if log_each:
+                    logger.debug(f'MANUAL-REMOVE: {date_str}')
 
             logger.info(f'Removidas {len(dates)} datas')
             return True
@@ -398,8 +587,8 @@ class ManualEditorHandler:
         """
         try:
             try:
-                start_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+                start_obj = _parse_iso_date(start_date)
+                end_obj = _parse_iso_date(end_date)
             except ValueError as e:
                 logger.error(f'Formato de data inválido: {start_date} a {end_date}')
                 return False
@@ -407,25 +596,12 @@ class ManualEditorHandler:
             # dtend deve ser o dia APÓS o último dia inclusivo
             dtend_obj = end_obj + timedelta(days=1)
 
-            # ✅ V1.3: SUMMARY e DESCRIPTION mostram datas iCalendar (DTSTART a DTEND)
-            summary_text = f'Remoção Manual de {start_obj.isoformat()} a {dtend_obj.isoformat()}'
-            description_text = f'Data Desbloqueada Manualmente ({start_obj.isoformat()} a {dtend_obj.isoformat()})'
+            template = _event_template('MANUAL-REMOVE', datetime.now(PT_TZ))
 
             # Criar ÚNICO evento MANUAL-REMOVE para todo o intervalo
-            event = Event()
-            event.add('uid', f'manual-remove-{start_date}-{end_date}-{uuid.uuid4()}')
-            event.add('summary', summary_text)
-            event.add('description', description_text)
-            event.add('dtstart', start_obj)
-            event.add('dtend', dtend_obj)
-            event.add('categories', 'MANUAL-REMOVE')
-            event.add('created', datetime.now(PT_TZ))
-            event.add('last-modified', datetime.now(PT_TZ))
-            event.add('status', 'CONFIRMED')
-            event.add('transp', 'TRANSPARENT')
-            event.add('class', 'PUBLIC')
-
-            self.manual_events.append(event)
+            event = _build_event('MANUAL-REMOVE', start_obj, dtend_obj, f'{start_date}-{end_date}', template)
+
+            self._append_manual_event(event, start_obj)
             logger.info(f'MANUAL-REMOVE (intervalo): {start_date} a {end_date}')
             return True
 
@@ -441,32 +617,41 @@ class ManualEditorHandler:
         - Backend cuida do fallback ao merge
         """
         try:
+            # Validar todas as datas primeiro; depois um único passe pelos eventos
+            log_each = logger.isEnabledFor(logging.DEBUG)
+            target_dates = set()
             for date_str in dates:
                 try:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+                    target_dates.add(_parse_iso_date(date_str))
                 except ValueError:
                     logger.error(f'Formato de data inválido: {date_str}')
                     continue
-
-                # Remover eventos dessa data do manual_events
-                new_events = []
-                for event in self.manual_events:
-                    try:
-                        event_date = event.get('DTSTART')
-                        if event_date:
-                            event_date = event_date.dt
-                            if isinstance(event_date, datetime):
-                                event_date = event_date.date()
-
-                            if event_date != date_obj:
-                                new_events.append(event)
-                        else:
-                            new_events.append(event)
-                    except:
-                        new_events.append(event)
-
-                self.manual_events = new_events
-                logger.info(f'CLEAR: {date_str}')
+                if log_each:
+                    logger.debug(f'CLEAR: {date_str}')
+
+            if target_dates:
+                self._manual_dicts = None
+
+                # Blocos em bruto: comparar o DTSTART 'YYYYMMDD' sem parse
+                target_ymds = {d.strftime('%Y%m%d').encode() for d in target_dates}
+                self._raw_event_blocks = [
+                    item for item in self._raw_event_blocks if item[0] not in target_ymds
+                ]
+
+                # Eventos da sessão: retirar do índice os dias pedidos e
+                # filtrar a lista uma vez pela identidade dos removidos
+                removed = set()
+                for day in target_dates:
+                    for event in self._manual_by_ord.pop(day.toordinal(), ()):
+                        removed.add(id(event))
+                if removed:
+                    kept = [
+                        (event, event_dict)
+                        for event, event_dict in zip(self.manual_events, self._manual_event_dicts)
+                        if id(event) not in removed
+                    ]
+                    self.manual_events = [event for event, _ in kept]
+                    self._manual_event_dicts = [event_dict for _, event_dict in kept]
 
             logger.info(f'Limpas {len(dates)} datas')
             return True
@@ -481,26 +666,20 @@ class ManualEditorHandler:
         ✅ CORRIGIDO v1.1: Modo binário correto (wb + bytes)
         """
         try:
-            # Criar calendário iCalendar
-            cal = Calendar()
-            cal.add('prodid', '-//Rental Manual Calendar//PT')
-            cal.add('version', '2.0')
-            cal.add('calscale', 'GREGORIAN')
-            cal.add('x-wr-calname', 'Manual Calendar')
-            cal.add('x-wr-timezone', 'Europe/Lisbon')
-
-            # Adicionar todos os eventos manuais
-            for event in self.manual_events:
-                cal.add_component(event)
-
-            # ✅ CORREÇÃO CRÍTICA: to_ical() retorna bytes, escrever diretamente
-            ical_bytes = cal.to_ical()
-
-            # Escrever no disco em modo binário
-            with open(MANUAL_CALENDAR_PATH, 'wb') as f:
-                f.write(ical_bytes)
-
-            logger.info(f'✅ Guardado {MANUAL_CALENDAR_PATH} com {len(self.manual_events)} eventos')
+            # Cabeçalho constante (serializado uma vez por processo); os VEVENT
+            # são escritos um a um, sem montar o ICS inteiro em memória
+            header = _manual_calendar_header()
+
+            # Escrever num temporário e substituir: um erro a meio não deixa
+            # o manual_calendar.ics truncado
+            with atomic_write(MANUAL_CALENDAR_PATH) as f:
+                f.write(header)
+                f.writelines(map(itemgetter(1), self._raw_event_blocks))
+                f.writelines(map(Event.to_ical, self.manual_events))
+                f.write(VCALENDAR_END)
+
+            total = len(self._raw_event_blocks) + len(self.manual_events)
+            logger.info(f'✅ Guardado {MANUAL_CALENDAR_PATH} com {total} eventos')
             return True
 
         except Exception as e:
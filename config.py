@@ -10,6 +10,7 @@ Desenvolvido por: PBrandão
 """
 
 import os
+from functools import lru_cache
 
 from dotenv import load_dotenv
 
@@ -102,8 +103,9 @@ class TestingConfig(Config):
     SESSION_PERMANENT = False
 
 
+@lru_cache(maxsize=1)
 def get_config():
-    """Get appropriate configuration based on FLASK_ENV."""
+    """Get appropriate configuration based on FLASK_ENV (memoized)."""
     env = os.getenv('FLASK_ENV', 'development')
 
     if env == 'production':
@@ -117,9 +119,6 @@ def get_config():
 # Verify required files/directories exist
 def verify_setup() -> bool:
     """Verify setup is complete."""
-
-def verify_setup():
-    """Verify setup is complete."""
     required_files = [
         'import_calendar.ics',
         'manual_calendar.ics',
@@ -152,12 +151,3 @@ def verify_setup():
         return False
 
     return True
-
-
-# Log configuration on import
-
-if __name__ != '__main__':
-    cfg = get_config()
-    print(f"✅ Configuration loaded: {cfg.FLASK_ENV}")
-    print(f"   Port: {cfg.FLASK_PORT}")
-    print(f"   Debug: {cfg.DEBUG}")
@@ -11,20 +11,30 @@ Desenvolvido por: PBrandão
 
 import os
 import sys
+import gzip
+import json
 import logging
-import subprocess
+import threading
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Tuple, Optional
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from typing import Any, Dict, List, Tuple, Optional
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, make_response, g
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 sys.path.insert(0, str(Path(__file__).parent))
 
 from auth import AuthManager, login_required, api_login_required
-from sync import sync_calendars, convert_events_to_nights, apply_night_overlay_rules, REPO_DIR
+from sync import sync_calendars, convert_events_to_nights, apply_night_overlay_rules, iso_days, REPO_DIR, file_lock, sync_lock
 from backend.notifier import EmailNotifier
-from backend.ics import ICSHandler
-from backend.manual_editor import ManualEditorHandler
+from backend.ics import ICSHandler, atomic_write
+from backend.manual_editor import ManualEditorHandler, MANUAL_CALENDAR_PATH
 
 # ✅ v2.1: Lógica de Deteção de Caminho para Aplicação (Render vs. Local)
 REPO_PATH = Path(REPO_DIR)
@@ -56,14 +66,109 @@ logger = logging.getLogger(__name__)
 logger.info(f"REPO_PATH (para Git): {REPO_PATH}")
 logger.info(f"APP_ROOT_PATH (para Flask): {APP_ROOT_PATH}")
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider do Flask baseado em orjson (encoder em C).
+    
+    Tipos que o orjson não serializa nativamente passam pelo default() do Flask.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """jsonify(): os bytes do orjson vão direto para a resposta, sem str intermédia.
+        
+        Argumentos como no jsonify(): um posicional é o próprio objeto, vários
+        formam uma lista, keywords formam um dict (não se podem misturar).
+        """
+        if args and kwargs:
+            raise TypeError('jsonify() aceita argumentos posicionais ou keywords, não ambos')
+        if len(args) == 1:
+            obj = args[0]
+        elif args:
+            obj = list(args)
+        else:
+            obj = kwargs or None
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
 # Inicialização da App Flask
 app = Flask(__name__, static_folder=str(STATIC_PATH), template_folder=str(TEMPLATES_PATH))
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+else:
+    # Sem orjson: json da stdlib sem ordenar chaves nem indentar (nem em debug)
+    app.json.sort_keys = False
+    app.json.compact = True
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-prod')
 app.config['SESSION_COOKIE_SECURE'] = os.getenv('FLASK_SESSION_SECURE', 'False').lower() == 'true'
 app.config['PERMANENT_SESSION_LIFETIME'] = 86400 * 7
 
+# Sessões server-side (opcional): com SESSION_REDIS_URL definido e Flask-Session
+# + redis instalados, o cookie passa a conter apenas o id da sessão
+SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL')
+if SESSION_REDIS_URL:
+    try:
+        import redis
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'redis'
+        app.config['SESSION_REDIS'] = redis.from_url(SESSION_REDIS_URL)
+        Session(app)
+        logger.info('Sessões server-side ativas (Redis)')
+    except ImportError as e:
+        logger.warning(f'SESSION_REDIS_URL definido mas Flask-Session/redis não instalados ({e}); a usar cookies')
+
 notifier = EmailNotifier()
 
+@app.before_request
+def capture_request_time():
+    """Regista a hora de início do pedido (usada nos timestamps das respostas)."""
+    g.request_started = datetime.now()
+
+def request_timestamp() -> str:
+    """Timestamp ISO-8601 do pedido atual, obtido uma única vez por pedido."""
+    return g.request_started.isoformat()
+
+# Respostas JSON abaixo deste tamanho não compensam a compressão
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 4
+
+def accepts_gzip() -> bool:
+    """True se o cliente do pedido atual aceitar respostas gzip."""
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+def set_gzip_body(response, compressed: bytes):
+    """Põe na resposta um corpo já comprimido com gzip e os respetivos headers."""
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def gzip_json_response(response):
+    """Comprime com gzip as respostas JSON, se o cliente aceitar gzip.
+    
+    Só respostas 200 já materializadas (as em streaming seguem sem alteração).
+    """
+    if (response.status_code != 200
+            or response.mimetype != 'application/json'
+            or response.is_streamed
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not accepts_gzip()):
+        return response
+    
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    
+    return set_gzip_body(response, gzip.compress(body, compresslevel=GZIP_LEVEL))
+
 # ============================================================================
 # ROTAS PÚBLICAS
 # ============================================================================
@@ -114,12 +219,25 @@ def dashboard_page():
     user = AuthManager.get_current_user()
     return render_template('dashboard.html', user=user)
 
+# HTML do editor manual (template sem variáveis): renderizado no 1.º pedido
+_manual_editor_html: Optional[str] = None
+
 @app.route('/manual-editor', methods=['GET'])
 @login_required
 def manual_editor_page():
-    """Página do editor manual de calendário."""
-    user = AuthManager.get_current_user()
-    return render_template('manual_editor.html', user=user)
+    """Página do editor manual de calendário.
+    
+    O template é estático, pelo que é renderizado uma única vez por processo
+    (em debug volta a ser renderizado a cada pedido, para refletir edições).
+    """
+    global _manual_editor_html
+    if _manual_editor_html is None or app.debug:
+        _manual_editor_html = render_template('manual_editor.html')
+    
+    response = make_response(_manual_editor_html)
+    response.cache_control.private = True
+    response.cache_control.max_age = 300
+    return response
 
 # ============================================================================
 # FUNÇÕES AUXILIARES - GITHUB API
@@ -127,33 +245,12 @@ def manual_editor_page():
 
 import base64
 import requests
+from requests.adapters import HTTPAdapter
 
-def get_github_file_sha(filepath: str) -> Optional[str]:
-    """Obtém o SHA de um ficheiro no repositório via API do GitHub."""
-    github_token = os.getenv('GITHUB_TOKEN')
-    github_owner = os.getenv('GITHUB_OWNER')
-    github_repo = os.getenv('GITHUB_REPO')
-    api_url = f"https://api.github.com/repos/{github_owner}/{github_repo}/contents/{filepath}"
-    headers = {
-        'Authorization': f'token {github_token}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
-    
-    try:
-        response = requests.get(api_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            sha = response.json()['sha']
-            logger.info(f"GIT API: SHA obtido para '{filepath}': {sha}")
-            return sha
-        elif response.status_code == 404:
-            logger.warning(f"GIT API: Ficheiro '{filepath}' não encontrado no repositório.")
-            return None
-        else:
-            logger.error(f"GIT API: Erro ao obter SHA para '{filepath}'. Status: {response.status_code}")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"GIT API: Exceção ao obter SHA para '{filepath}': {e}")
-        return None
+# Sessão HTTP partilhada para a API do GitHub: reutiliza a ligação TLS
+# (keep-alive) entre pedidos em vez de um handshake novo por chamada
+github_session = requests.Session()
+github_session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
 
 def download_github_file(filepath: str) -> bool:
     """✅ NOVO v1.1: Descarrega ficheiro do GitHub para disco local.
@@ -170,7 +267,7 @@ def download_github_file(filepath: str) -> bool:
     }
     
     try:
-        response = requests.get(api_url, headers=headers, timeout=10)
+        response = github_session.get(api_url, headers=headers, timeout=10)
         if response.status_code == 200:
             content_base64 = response.json()['content']
             content_bytes = base64.b64decode(content_base64)
@@ -197,63 +294,198 @@ def download_github_file(filepath: str) -> bool:
         logger.error(f"GIT API: Exceção ao descarregar '{filepath}': {e}")
         return False
 
-def update_github_file(filepath: str, commit_message: str) -> bool:
-    """Lê um ficheiro local e atualiza-o no GitHub via API.
+def local_upload_path(filepath: str) -> Path:
+    """Caminho local de um ficheiro a enviar: REPO_PATH e depois APP_ROOT_PATH (Render)."""
+    local_file_path = REPO_PATH / filepath
+    if not local_file_path.exists():
+        local_file_path = APP_ROOT_PATH / filepath
+    return local_file_path
+
+def read_github_tree_entries(filepaths: List[str]) -> Optional[List[Dict]]:
+    """Lê ficheiros locais como entradas de tree para a Git Data API.
     
-    ✅ v2.2: Procura ficheiro em REPO_PATH e APP_ROOT_PATH (Render compatibility)
+    Procura cada ficheiro em REPO_PATH e depois em APP_ROOT_PATH (Render).
+    Retorna None se algum ficheiro não existir ou não puder ser lido (UTF-8).
+    """
+    tree_entries = []
+    for filepath in filepaths:
+        local_file_path = local_upload_path(filepath)
+        
+        try:
+            with open(local_file_path, 'rb') as f:
+                content = f.read().decode('utf-8')
+        except FileNotFoundError:
+            logger.error(f"GIT API: Ficheiro local '{local_file_path}' não encontrado para upload.")
+            return None
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"GIT API: Erro ao ler '{local_file_path}' para upload: {e}")
+            return None
+        
+        tree_entries.append({'path': filepath, 'mode': '100644', 'type': 'blob', 'content': content})
+    return tree_entries
+
+def commit_github_tree_entries(tree_entries: List[Dict], commit_message: str) -> bool:
+    """Cria UM commit com as entradas dadas sobre o HEAD atual e avança o ref.
+    
+    Se o conteúdo não mudar (tree resultante igual à do HEAD), não cria commit.
+    Se o ref avançar entretanto (422 no update, ex.: push de outro processo),
+    repete uma vez sobre o novo HEAD.
     """
     github_token = os.getenv('GITHUB_TOKEN')
     github_owner = os.getenv('GITHUB_OWNER')
     github_repo = os.getenv('GITHUB_REPO')
+    branch = 'main'
+    paths = ', '.join(entry['path'] for entry in tree_entries)
 
-    # ✅ v2.2: Tentar primeiro REPO_PATH, depois APP_ROOT_PATH
-    local_file_path = REPO_PATH / filepath
-    
-    # Se não existir em REPO_PATH, tentar em APP_ROOT_PATH (ambiente Render com /src)
-    if not local_file_path.exists():
-        local_file_path = APP_ROOT_PATH / filepath
-        logger.info(f"GIT API: Ficheiro não encontrado em REPO_PATH, usando APP_ROOT_PATH: {local_file_path}")
-    
-    if not local_file_path.exists():
-        logger.error(f"GIT API: Ficheiro local '{local_file_path}' não encontrado para upload.")
-        return False
+    api_base = f"https://api.github.com/repos/{github_owner}/{github_repo}/git"
+    headers = {
+        'Authorization': f'token {github_token}',
+        'Accept': 'application/vnd.github.v3+json'
+    }
 
     try:
-        with open(local_file_path, 'rb') as f:
-            content_bytes = f.read()
-    except FileNotFoundError:
-        logger.error(f"GIT API: Ficheiro local '{local_file_path}' não encontrado para upload.")
+        for attempt in range(2):
+            response = github_session.get(f"{api_base}/ref/heads/{branch}", headers=headers, timeout=10)
+            response.raise_for_status()
+            head_sha = response.json()['object']['sha']
+            
+            response = github_session.get(f"{api_base}/commits/{head_sha}", headers=headers, timeout=10)
+            response.raise_for_status()
+            base_tree_sha = response.json()['tree']['sha']
+            
+            response = github_session.post(f"{api_base}/trees", headers=headers, timeout=30,
+                                     json={'base_tree': base_tree_sha, 'tree': tree_entries})
+            response.raise_for_status()
+            tree_sha = response.json()['sha']
+            
+            # Tree igual à do HEAD: nada mudou, sem commit vazio nem avanço do ref
+            if tree_sha == base_tree_sha:
+                logger.info(f"GIT API: Sem alterações em {paths}; commit dispensado")
+                return True
+            
+            response = github_session.post(f"{api_base}/commits", headers=headers, timeout=10,
+                                     json={'message': commit_message, 'tree': tree_sha, 'parents': [head_sha]})
+            response.raise_for_status()
+            commit_sha = response.json()['sha']
+            
+            response = github_session.patch(f"{api_base}/refs/heads/{branch}", headers=headers, timeout=10,
+                                      json={'sha': commit_sha})
+            # 422: o ref já não aponta para head_sha (não é fast-forward)
+            if response.status_code == 422 and attempt == 0:
+                logger.warning(f"GIT API: HEAD de {branch} avançou durante o push de {paths}; a repetir")
+                continue
+            response.raise_for_status()
+            
+            logger.info(f"GIT API: {len(tree_entries)} ficheiro(s) atualizados num commit ({commit_sha[:7]}): {paths}")
+            return True
+    except requests.exceptions.RequestException as e:
+        logger.error(f"GIT API: Erro ao atualizar {paths}: {e}")
         return False
 
-    content_base64 = base64.b64encode(content_bytes).decode('utf-8')
-    sha = get_github_file_sha(filepath)
+# Serializa os pushes de todos os workers gunicorn (flock): cada um envia o
+# estado do disco no momento em que corre, por ordem
+PUSH_LOCK_PATH = str(REPO_PATH / '.push.lock')
 
-    api_url = f"https://api.github.com/repos/{github_owner}/{github_repo}/contents/{filepath}"
-    headers = {
-        'Authorization': f'token {github_token}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
+def update_github_files(filepaths: List[str], commit_message: str) -> bool:
+    """Atualiza vários ficheiros no GitHub num ÚNICO commit (Git Data API).
+    
+    A API de contents cria um commit por ficheiro; aqui constrói-se uma tree
+    sobre a do HEAD atual e faz-se um só commit + avanço do ref.
+    Os ficheiros são lidos só agora, com o lock do sync (nunca a meio de um
+    sync), e o push inteiro corre sob PUSH_LOCK_PATH: um push mais antigo de
+    outro worker não pode repor calendários desatualizados por cima.
+    """
+    with file_lock(PUSH_LOCK_PATH):
+        with sync_lock():
+            tree_entries = read_github_tree_entries(filepaths)
+        if tree_entries is None:
+            return False
+        return commit_github_tree_entries(tree_entries, commit_message)
+
+# Push para o GitHub em background: um único worker garante commits em série
+_push_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gitpush')
+_push_lock = threading.Lock()
+
+# Estado do último push, partilhado por todos os workers gunicorn (o pedido de
+# /api/push-status pode chegar a um worker diferente do que agendou o push)
+PUSH_STATUS_PATH = REPO_PATH / '.push_status.json'
+
+def read_push_status() -> Optional[Dict[str, Any]]:
+    """Lê o estado do último push; None se não houver (ou estiver ilegível)."""
+    try:
+        with open(PUSH_STATUS_PATH, 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_push_status(state: Dict[str, Any]) -> None:
+    """Grava o estado do último push (escrita atómica)."""
+    try:
+        with atomic_write(PUSH_STATUS_PATH) as f:
+            f.write(json.dumps(state).encode('utf-8'))
+    except OSError as e:
+        logger.error(f"GIT API: Erro ao gravar estado do push: {e}")
+
+def _finish_push(state: Dict[str, Any], future) -> None:
+    """Callback do push: regista o resultado e notifica em caso de falha."""
+    error = future.exception()
+    ok = error is None and future.result()
+    state.update(
+        status='success' if ok else 'error',
+        error=str(error) if error else (None if ok else 'Falha na API do GitHub (ver app.log)'),
+        finished_at=datetime.now().isoformat()
+    )
+    
+    if not ok:
+        logger.error(f"GIT API: Push em background falhou ({', '.join(state['files'])}): {state['error']}")
+        notifier.send_error(f"GitHub push error ({state['message']}): {state['error']}")
+    
+    with _push_lock:
+        # Só atualiza se entretanto nenhum outro push (deste ou de outro worker)
+        # tiver sido agendado
+        current = read_push_status()
+        if current is None or current.get('id') == state['id']:
+            write_push_status(state)
 
-    data = {
+def queue_github_update(filepaths: List[str], commit_message: str) -> bool:
+    """Agenda a atualização de ficheiros no GitHub sem bloquear o pedido HTTP.
+    
+    O conteúdo é lido quando o push corre (ver update_github_files), e não ao
+    agendar: é sempre enviado o estado mais recente do disco. Retorna False se
+    algum ficheiro não existir. O resultado fica disponível em /api/push-status
+    (PUSH_STATUS_PATH); uma falha é registada no log e notificada por email.
+    """
+    missing = [filepath for filepath in filepaths if not local_upload_path(filepath).exists()]
+    if missing:
+        logger.error(f"GIT API: Ficheiro(s) local(is) não encontrado(s) para upload: {', '.join(missing)}")
+        return False
+    
+    state = {
+        'id': os.urandom(8).hex(),
+        'status': 'pending',
+        'error': None,
+        'files': list(filepaths),
         'message': commit_message,
-        'content': content_base64,
-        'branch': 'main'
+        'queued_at': datetime.now().isoformat(),
+        'worker': os.getpid(),
     }
+    with _push_lock:
+        write_push_status(state)
+    
+    future = _push_pool.submit(update_github_files, list(filepaths), commit_message)
+    future.add_done_callback(lambda done: _finish_push(dict(state), done))
+    logger.info(f"GIT API: Push agendado em background: {', '.join(filepaths)}")
+    return True
 
-    if sha:
-        data['sha'] = sha
-
+def _pid_alive(pid: int) -> bool:
+    """True se o processo pid (neste host) ainda existir."""
     try:
-        response = requests.put(api_url, headers=headers, json=data, timeout=30)
-        if response.status_code in [200, 201]:
-            logger.info(f"GIT API: Ficheiro '{filepath}' atualizado/criado com sucesso.")
-            return True
-        else:
-            logger.error(f"GIT API: Erro ao atualizar ficheiro '{filepath}'. Status: {response.status_code}, Resposta: {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"GIT API: Exceção ao atualizar ficheiro '{filepath}': {e}")
+        os.kill(pid, 0)
+    except ProcessLookupError:
         return False
+    except OSError:
+        pass
+    return True
 
 # ============================================================================
 # API - SESSION
@@ -286,6 +518,97 @@ def api_key_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def calendar_etag(filepaths: List[str], *extra) -> Tuple[str, float]:
+    """ETag derivada de (mtime_ns, tamanho) dos ficheiros .ics + valores extra.
+    
+    Retorna (etag, last_modified), com last_modified = mtime mais recente.
+    Ficheiros inexistentes contam como '0'.
+    """
+    parts = []
+    last_modified = 0.0
+    for filepath in filepaths:
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            parts.append('0')
+            continue
+        parts.append(f'{st.st_mtime_ns:x}-{st.st_size:x}')
+        last_modified = max(last_modified, st.st_mtime)
+    parts.extend(str(value) for value in extra)
+    return '-'.join(parts), last_modified
+
+# Corpos já serializados das respostas de conditional_get, por
+# (endpoint, query string): [etag, corpo, content type, corpo gzip ou None].
+# Máx. _BODY_CACHE_MAX entradas; ao encher, a cache é esvaziada. As respostas
+# em cache não devem incluir valores por pedido (ex.: timestamp).
+_body_cache: Dict[Tuple[str, bytes], list] = {}
+_BODY_CACHE_MAX = 64
+
+def conditional_get(*filepaths: str, daily: bool = False):
+    """Decorator: GET condicional (ETag/Last-Modified) sobre ficheiros .ics.
+    
+    Se o cliente enviar If-None-Match igual à ETag atual, devolve 304 sem
+    ler nem serializar os calendários. Sem If-None-Match, enquanto a ETag não
+    mudar, devolve os bytes já serializados da última resposta 200 (o mesmo
+    corpo que o 304 mandaria o cliente reutilizar), e a variante gzip é
+    comprimida uma só vez. daily=True inclui a data de hoje na ETag (para
+    respostas cuja janela temporal depende do dia).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            extra = (date.today().isoformat(),) if daily else ()
+            etag, last_modified = calendar_etag([str(p) for p in filepaths], *extra)
+            
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                cache_key = (request.endpoint, request.query_string)
+                cached = _body_cache.get(cache_key)
+                if cached is None or cached[0] != etag:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    cached = None
+                    if not response.is_streamed:
+                        if len(_body_cache) >= _BODY_CACHE_MAX:
+                            _body_cache.clear()
+                        cached = [etag, response.get_data(), response.content_type, None]
+                        _body_cache[cache_key] = cached
+                
+                if cached is not None:
+                    response = app.response_class(cached[1], content_type=cached[2])
+                    if accepts_gzip() and len(cached[1]) >= GZIP_MIN_SIZE:
+                        if cached[3] is None:
+                            cached[3] = gzip.compress(cached[1], compresslevel=GZIP_LEVEL)
+                        set_gzip_body(response, cached[3])
+            
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+def json_array_stream(items: List[Any], batch_size: int = 500):
+    """Gerador: serializa uma lista como array JSON, em blocos de batch_size itens.
+    
+    O cliente recebe o mesmo array JSON de jsonify(items), mas a resposta sai
+    em chunks sem que o corpo completo seja materializado de uma só vez.
+    """
+    if orjson is not None:
+        dumps = lambda obj: orjson.dumps(obj, default=app.json.default)
+    else:
+        dumps = lambda obj: app.json.dumps(obj).encode('utf-8')
+    
+    yield b'['
+    for i in range(0, len(items), batch_size):
+        # Cada bloco é um array JSON: sem os parênteses retos, separados por vírgula
+        chunk = dumps(items[i:i + batch_size])[1:-1]
+        yield b',' + chunk if i else chunk
+    yield b']\n'
+
 # ============================================================================
 # API - SYNC
 # ============================================================================
@@ -306,13 +629,12 @@ def api_sync():
         
         if success:
             logger.info("API: Sincronização local concluída. Atualizando GitHub...")
-            update_github_file('import_calendar.ics', f'Auto-sync: import_calendar.ics (Fonte: {source})')
-            update_github_file('master_calendar.ics', f'Auto-sync: master_calendar.ics (Fonte: {source})')
+            queue_github_update(['import_calendar.ics', 'master_calendar.ics'], f'Auto-sync: import + master (Fonte: {source})')
             
             return jsonify(
                 status='success',
-                message='Sincronização completada e ficheiros atualizados no GitHub.',
-                timestamp=datetime.now().isoformat()
+                message='Sincronização completada; atualização do GitHub em curso.',
+                timestamp=request_timestamp()
             ), 200
         else:
             logger.error('='*80)
@@ -321,7 +643,7 @@ def api_sync():
             return jsonify(
                 status='error',
                 message='Erro na sincronização',
-                timestamp=datetime.now().isoformat()
+                timestamp=request_timestamp()
             ), 500
             
     except Exception as e:
@@ -332,16 +654,35 @@ def api_sync():
         return jsonify(
             status='error',
             message=str(e),
-            timestamp=datetime.now().isoformat()
+            timestamp=request_timestamp()
         ), 500
 
 @app.route('/api/sync-manual', methods=['POST'])
 @api_login_required
 def api_sync_manual():
-    """Força sincronização imediata a partir da UI (requer login)."""
+    """Força sincronização imediata a partir da UI (requer login).
+    
+    Query param opcional max_age (segundos): se o master_calendar.ics tiver
+    sido gerado há menos de max_age segundos, o sync é dispensado (skipped=True).
+    """
     try:
         user = AuthManager.get_current_user()
         should_notify = request.args.get('notify', 'true').lower() == 'true'
+        max_age = request.args.get('max_age', 0, type=int)
+        
+        if max_age > 0:
+            try:
+                age = g.request_started.timestamp() - os.path.getmtime(REPO_PATH / 'master_calendar.ics')
+            except OSError:
+                age = None
+            if age is not None and age < max_age:
+                logger.info(f"API: Sync manual dispensado (master_calendar.ics com {age:.0f}s < {max_age}s)")
+                return jsonify(
+                    status='success',
+                    message='Calendário recente; sincronização dispensada.',
+                    skipped=True,
+                    timestamp=request_timestamp()
+                ), 200
         
         logger.info('='*80)
         logger.info(f"API: Sincronização MANUAL iniciada por utilizador: {user} | Notificar: {should_notify}")
@@ -356,8 +697,7 @@ def api_sync_manual():
         
         if success:
             logger.info("API: Sincronização manual concluída. Atualizando GitHub...")
-            update_github_file('import_calendar.ics', f'Manual sync: import_calendar.ics (User: {user})')
-            update_github_file('master_calendar.ics', f'Manual sync: master_calendar.ics (User: {user})')
+            queue_github_update(['import_calendar.ics', 'master_calendar.ics'], f'Manual sync: import + master (User: {user})')
             
             if should_notify:
                 logger.info("Enviando notificação de sucesso...")
@@ -365,8 +705,8 @@ def api_sync_manual():
             
             return jsonify(
                 status='success',
-                message='Sincronização completada e ficheiros atualizados no GitHub.',
-                timestamp=datetime.now().isoformat()
+                message='Sincronização completada; atualização do GitHub em curso.',
+                timestamp=request_timestamp()
             ), 200
         else:
             logger.error('='*80)
@@ -375,7 +715,7 @@ def api_sync_manual():
             return jsonify(
                 status='error',
                 message='Erro na sincronização',
-                timestamp=datetime.now().isoformat()
+                timestamp=request_timestamp()
             ), 500
             
     except Exception as e:
@@ -386,9 +726,31 @@ def api_sync_manual():
         return jsonify(
             status='error',
             message=str(e),
-            timestamp=datetime.now().isoformat()
+            timestamp=request_timestamp()
         ), 500
 
+@app.route('/api/push-status', methods=['GET'])
+@api_login_required
+def api_push_status():
+    """Estado do último push agendado para o GitHub (partilhado entre workers).
+    
+    'lost' indica um push pendente cujo worker terminou antes de o concluir.
+    served_by identifica o worker que respondeu.
+    """
+    last_push = read_push_status()
+    if last_push is None:
+        return jsonify(status='idle', served_by=os.getpid(), timestamp=request_timestamp()), 200
+    
+    last_push.pop('id', None)
+    if last_push['status'] == 'pending' and not _pid_alive(last_push['worker']):
+        last_push['status'] = 'lost'
+    
+    return jsonify(
+        served_by=os.getpid(),
+        timestamp=request_timestamp(),
+        **last_push
+    ), 200
+
 # ============================================================================
 # API - CALENDAR (IMPORT/MANUAL/SAVE)
 # ============================================================================
@@ -427,8 +789,7 @@ def api_calendar_import():
             logger.warning('API: Continuando mesmo com erro...')
         
         logger.info('API: Sincronização local concluída. Atualizando GitHub...')
-        update_github_file('import_calendar.ics', 'Calendar import: import_calendar.ics')
-        update_github_file('master_calendar.ics', 'Calendar import: master_calendar.ics')
+        queue_github_update(['import_calendar.ics', 'master_calendar.ics'], 'Calendar import: import + master')
         
         logger.info('API: Carregando import_calendar.ics ATUALIZADO...')
         editor = ManualEditorHandler()
@@ -437,7 +798,7 @@ def api_calendar_import():
         logger.info(f'API: Carregados {len(events)} eventos do import_calendar.ics')
         logger.info('='*80)
         
-        return jsonify(events), 200
+        return app.response_class(json_array_stream(events), mimetype='application/json'), 200
         
     except Exception as e:
         logger.error('='*80)
@@ -447,6 +808,7 @@ def api_calendar_import():
 
 @app.route('/api/calendar/manual', methods=['GET'])
 @api_login_required
+@conditional_get(MANUAL_CALENDAR_PATH)
 def api_calendar_manual():
     """GET /api/calendar/manual - Carrega eventos do manual_calendar.ics"""
     try:
@@ -472,6 +834,18 @@ def api_calendar_save():
         logger.info(f'API: POST /api/calendar/save - {len(added)} adições, {len(removed)} remoções')
         logger.info('='*80)
         
+        # Todas as alterações da sessão chegam num único lote; lote vazio não
+        # justifica reescrever o ficheiro, re-sincronizar nem fazer commits.
+        if not added and not removed:
+            logger.info('API: Nenhuma alteração recebida - nada a guardar')
+            return jsonify(
+                success=True,
+                message='Sem alterações para guardar.',
+                events_added=0,
+                events_removed=0,
+                timestamp=request_timestamp()
+            ), 200
+        
         editor = ManualEditorHandler()
         
         block_intervals = [e for e in added if e['category'] == 'MANUAL-BLOCK' and 'startDate' in e]
@@ -506,29 +880,26 @@ def api_calendar_save():
             logger.error('API: Erro ao guardar manual_calendar.ics')
             return jsonify(success=False, message='Erro ao guardar manual_calendar.ics'), 500
         
-        logger.info("API: manual_calendar.ics guardado localmente. Atualizando no GitHub...")
+        logger.info("API: manual_calendar.ics guardado localmente. Re-sincronizar para atualizar master_calendar.ics...")
         user = AuthManager.get_current_user() or 'unknown'
-        git_success_manual = update_github_file('manual_calendar.ics', f'Editor manual: {user}')
-        
-        logger.info("API: Re-sincronizar para atualizar master_calendar.ics...")
         sync_success = sync_calendars(force_download=False)
         
         if not sync_success:
             logger.error('API: Erro ao re-sincronizar calendários após guardar alterações manuais.')
         
-        logger.info("API: Sincronização local concluída. Atualizando master no GitHub...")
-        git_success_master = update_github_file('master_calendar.ics', f'Update master por editor manual (User: {user})')
+        logger.info("API: Sincronização local concluída. Atualizando manual + master no GitHub...")
+        git_queued = queue_github_update(['manual_calendar.ics', 'master_calendar.ics'], f'Editor manual: manual + master (User: {user})')
         
         logger.info('='*80)
         
         return jsonify(
             success=True,
-            message='Alterações guardadas e calendários sincronizados com sucesso no GitHub.',
+            message='Alterações guardadas e calendários sincronizados; atualização do GitHub em curso.',
             events_added=len(added),
             events_removed=len(removed),
-            git_synced=git_success_manual and git_success_master,
+            git_push='queued' if git_queued else 'error',
             sync_success=sync_success,
-            timestamp=datetime.now().isoformat()
+            timestamp=request_timestamp()
         ), 200
         
     except Exception as e:
@@ -538,7 +909,7 @@ def api_calendar_save():
         return jsonify(
             success=False,
             message=str(e),
-            timestamp=datetime.now().isoformat()
+            timestamp=request_timestamp()
         ), 500
 
 # ============================================================================
@@ -547,6 +918,7 @@ def api_calendar_save():
 
 @app.route('/api/calendar/nights', methods=['GET'])
 @api_login_required
+@conditional_get('master_calendar.ics', daily=True)
 def api_calendar_nights():
     """GET /api/calendar/nights - NOITES consolidadas a partir do master_calendar.ics"""
     try:
@@ -562,10 +934,8 @@ def api_calendar_nights():
         today = date.today()
         start_date = today - timedelta(days=365)
         end_date = today + timedelta(days=730) # 2 anos para o futuro
-        current = start_date
-        while current <= end_date:
-            final_nights[current.isoformat()] = {'category': 'AVAILABLE', 'description': 'Disponível', 'uid': ''}
-            current += timedelta(days=1)
+        for day_str in iso_days(start_date, end_date + timedelta(days=1)):
+            final_nights[day_str] = {'category': 'AVAILABLE', 'description': 'Disponível', 'uid': ''}
 
         # Converter eventos do master para o formato de noites e sobrepor
         master_nights = convert_events_to_nights(master_events)
@@ -578,8 +948,7 @@ def api_calendar_nights():
         return jsonify(
             success=True,
             data=final_nights,
-            count=len(final_nights),
-            timestamp=datetime.now().isoformat()
+            count=len(final_nights)
         ), 200
         
     except Exception as e:
@@ -587,22 +956,56 @@ def api_calendar_nights():
         return jsonify(
             success=False,
             error=str(e),
-            timestamp=datetime.now().isoformat()
+            timestamp=request_timestamp()
         ), 500
 
 # ============================================================================
 # API - EVENTS
 # ============================================================================
 
+# Cor por categoria em /api/events (constante: criada uma vez, não por pedido)
+EVENTS_COLORMAP = {
+    'RESERVATION': '#ff0000',
+    'PREP-TIME': '#ffaa00',
+    'MANUAL-BLOCK': '#00ff00',
+    'MANUAL-REMOVE': '#ffff00',
+    'AVAILABLE': '#4dd9ff'
+}
+
 @app.route('/api/events', methods=['GET'])
 @api_login_required
+@conditional_get('import_calendar.ics', 'manual_calendar.ics')
 def api_events():
-    """GET /api/events - Retorna eventos para renderização no calendário"""
+    """GET /api/events - Retorna eventos para renderização no calendário
+    
+    Query params opcionais start/end (YYYY-MM-DD) limitam aos eventos do intervalo;
+    têm de vir os dois, com datas válidas e start <= end (senão 400).
+    """
     try:
         logger.info('API: GET /api/events')
         
-        import_events = ICSHandler.read_ics_file('import_calendar.ics') or []
-        manual_events = ICSHandler.read_ics_file('manual_calendar.ics') or []
+        range_start = request.args.get('start')
+        range_end = request.args.get('end')
+        
+        if range_start or range_end:
+            try:
+                valid = date.fromisoformat(range_start[:10]) <= date.fromisoformat(range_end[:10])
+            except (TypeError, ValueError):
+                valid = False
+            if not valid:
+                logger.warning(f'API: Intervalo inválido em /api/events: start={range_start!r} end={range_end!r}')
+                return jsonify(
+                    success=False,
+                    error='Parâmetros start/end inválidos (esperado YYYY-MM-DD, start <= end)',
+                    timestamp=request_timestamp()
+                ), 400
+        
+        if range_start and range_end:
+            import_events = ICSHandler.read_ics_range('import_calendar.ics', range_start, range_end) or []
+            manual_events = ICSHandler.read_ics_range('manual_calendar.ics', range_start, range_end) or []
+        else:
+            import_events = ICSHandler.read_ics_file('import_calendar.ics') or []
+            manual_events = ICSHandler.read_ics_file('manual_calendar.ics') or []
         
         logger.info(f'API: Carregados {len(import_events)} eventos (import) + {len(manual_events)} eventos (manual)')
         
@@ -612,34 +1015,19 @@ def api_events():
         
         logger.info(f'API: {len(final_nights)} noites finais')
         
-        COLORMAP = {
-            'RESERVATION': '#ff0000',
-            'PREP-TIME': '#ffaa00',
-            'MANUAL-BLOCK': '#00ff00',
-            'MANUAL-REMOVE': '#ffff00',
-            'AVAILABLE': '#4dd9ff'
-        }
-        
-        events_list = []
-        processed = set()
-        all_events = import_events + manual_events
-        
-        for event in all_events:
-            event_id = (
-                event.get('dtstart'),
-                event.get('dtend'),
-                event.get('categories', 'AVAILABLE')
-            )
-            
-            if event_id in processed:
-                continue
-            
-            processed.add(event_id)
-            
+        # Um só passe sobre import + manual, num dict por (dtstart, dtend, categoria):
+        # a primeira ocorrência define a linha, as seguintes são ignoradas
+        rows: Dict[Tuple[Any, Any, str], Dict[str, Any]] = {}
+        
+        for event in chain(import_events, manual_events):
+            # Cada campo lido uma só vez: serve de chave de deduplicação e de valor
             dtstart = event.get('dtstart')
             dtend = event.get('dtend')
             category = event.get('categories', 'AVAILABLE')
-            summary = event.get('summary', 'Event')
+            event_id = (dtstart, dtend, category)
+            
+            if event_id in rows:
+                continue
             
             if isinstance(dtstart, str):
                 dtstart = f"{dtstart[:4]}-{dtstart[4:6]}-{dtstart[6:8]}"
@@ -647,23 +1035,22 @@ def api_events():
             if isinstance(dtend, str):
                 dtend = f"{dtend[:4]}-{dtend[4:6]}-{dtend[6:8]}"
             
-            color = COLORMAP.get(category, '#4dd9ff')
-            
-            events_list.append({
-                'summary': summary,
+            rows[event_id] = {
+                'summary': event.get('summary', 'Event'),
                 'start': dtstart,
                 'end': dtend,
                 'type': category,
-                'color': color
-            })
+                'color': EVENTS_COLORMAP.get(category, '#4dd9ff')
+            }
+        
+        events_list = list(rows.values())
         
         logger.info(f'API: Retornando {len(events_list)} eventos formatados')
         
         return jsonify(
             success=True,
             data=events_list,
-            count=len(events_list),
-            timestamp=datetime.now().isoformat()
+            count=len(events_list)
         ), 200
         
     except Exception as e:
@@ -671,7 +1058,7 @@ def api_events():
         return jsonify(
             success=False,
             error=str(e),
-            timestamp=datetime.now().isoformat()
+            timestamp=request_timestamp()
         ), 500
 
 # ============================================================================
@@ -707,6 +1094,7 @@ if __name__ == '__main__':
     logger.info('  POST /api/calendar/save - Grava alterações + git push')
     logger.info('  GET  /api/calendar/nights - Retorna NOITES consolidadas')
     logger.info('  GET  /api/events - Eventos para barras visuais')
+    logger.info('  GET  /api/push-status - Estado do último push para o GitHub')
     logger.info('='*80)
     
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -11,9 +11,13 @@ Desenvolvido por: PBrandão
 import os
 import sys
 import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional, Set, Tuple, Any
+from typing import List, Dict, Optional, Sequence, Set, Tuple, Any
 import uuid
 
 try:
@@ -28,6 +32,8 @@ except ImportError as e:
 
 load_dotenv()
 
+from backend.ics import atomic_write
+
 # ============================================================================
 # CONFIGURAÇÃO
 # ============================================================================
@@ -54,6 +60,7 @@ REPO_DIR = find_repo_dir()
 IMPORT_CALENDAR_PATH = str(REPO_DIR / "import_calendar.ics")
 MASTER_CALENDAR_PATH = str(REPO_DIR / "master_calendar.ics")
 MANUAL_CALENDAR_PATH = str(REPO_DIR / "manual_calendar.ics")
+SYNC_LOCK_PATH = str(REPO_DIR / ".sync.lock")
 LOG_FILE = str(REPO_DIR / "sync.log")
 
 AIRBNB_ICAL_URL = os.getenv('AIRBNB_ICAL_URL', '')
@@ -62,6 +69,9 @@ VRBO_ICAL_URL = os.getenv('VRBO_ICAL_URL', '')
 BUFFER_DAYS_BEFORE = int(os.getenv('BUFFER_DAYS_BEFORE', 1))
 BUFFER_DAYS_AFTER = int(os.getenv('BUFFER_DAYS_AFTER', 1))
 
+# Última linha de um VCALENDAR serializado pelo icalendar
+VCALENDAR_END = b'END:VCALENDAR\r\n'
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -77,7 +87,7 @@ logger.info(f"IMPORT_CALENDAR_PATH: {IMPORT_CALENDAR_PATH}")
 logger.info(f"MASTER_CALENDAR_PATH: {MASTER_CALENDAR_PATH}")
 logger.info(f"MANUAL_CALENDAR_PATH: {MANUAL_CALENDAR_PATH}")
 
-__all__ = ['sync_calendars', 'convert_events_to_nights', 'apply_night_overlay_rules', 'REPO_DIR']
+__all__ = ['sync_calendars', 'convert_events_to_nights', 'apply_night_overlay_rules', 'iso_days', 'REPO_DIR']
 
 # ============================================================================
 # FUNÇÕES AUXILIARES
@@ -130,6 +140,34 @@ def to_datetime(dt_obj) -> Optional[datetime]:
     
     return None
 
+# Tabela de strings 'YYYY-MM-DD' à volta de hoje, indexada por ordinal: cobre
+# as janelas usadas pelo frontend (1 ano para trás, 2 para a frente)
+_ISO_TABLE_BEFORE = 800
+_ISO_TABLE_AFTER = 1200
+
+@lru_cache(maxsize=2)
+def _iso_day_table(today_ordinal: int) -> Tuple[str, ...]:
+    """Strings ISO de today-_ISO_TABLE_BEFORE a today+_ISO_TABLE_AFTER."""
+    first = today_ordinal - _ISO_TABLE_BEFORE
+    return tuple(
+        date.fromordinal(first + i).isoformat()
+        for i in range(_ISO_TABLE_BEFORE + _ISO_TABLE_AFTER + 1)
+    )
+
+def iso_days(start: date, end: date) -> Sequence[str]:
+    """Strings ISO dos dias em [start, end) (end exclusivo).
+
+    Dentro da janela da tabela é só uma fatia; fora dela calcula dia a dia.
+    """
+    today_ordinal = date.today().toordinal()
+    table = _iso_day_table(today_ordinal)
+    first = today_ordinal - _ISO_TABLE_BEFORE
+    lo = start.toordinal() - first
+    hi = end.toordinal() - first
+    if lo >= 0 and hi <= len(table):
+        return table[lo:hi]
+    return [date.fromordinal(o).isoformat() for o in range(start.toordinal(), end.toordinal())]
+
 def normalize_uid(uid: str) -> str:
     """Normaliza UID."""
     if not uid:
@@ -179,15 +217,12 @@ def convert_events_to_nights(events: List[Dict]) -> Dict[str, Dict]:
         if not dtstart or not dtend:
             continue
         
-        current = dtstart
-        while current < dtend:
-            night_date_str = current.isoformat()
+        for night_date_str in iso_days(dtstart, dtend):
             night_map[night_date_str] = {
                 'category': categories,
                 'description': description,
                 'uid': uid,
             }
-            current += timedelta(days=1)
     
     log_info(f"NIGHTS: Convertidos {len(events)} eventos → {len(night_map)} noites")
     return night_map
@@ -261,11 +296,19 @@ def fetch_all_calendars(force_download: bool = False) -> Optional[Dict[str, Opti
     else:
         log_info("⚠️ FORCE DOWNLOAD: Ignorando cache, baixando calendários frescos...")
     
-    calendars = {
-        'AIRBNB': download_calendar(AIRBNB_ICAL_URL, 'AIRBNB'),
-        'BOOKING': download_calendar(BOOKING_ICAL_URL, 'BOOKING'),
-        'VRBO': download_calendar(VRBO_ICAL_URL, 'VRBO'),
+    # Downloads em paralelo: o parse de um calendário (CPU) sobrepõe-se à
+    # espera de rede dos outros, em vez de somar os três tempos
+    sources = {
+        'AIRBNB': AIRBNB_ICAL_URL,
+        'BOOKING': BOOKING_ICAL_URL,
+        'VRBO': VRBO_ICAL_URL,
     }
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='ical-download') as pool:
+        futures = {
+            source: pool.submit(download_calendar, url, source)
+            for source, url in sources.items()
+        }
+        calendars = {source: future.result() for source, future in futures.items()}
     
     if all(v is None for v in calendars.values()):
         log_error("ERROR: No calendar imported and import_calendar.ics does not exist")
@@ -686,11 +729,19 @@ def export_to_file(cal: Calendar, filepath: str) -> bool:
     """Export calendar."""
     try:
         Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-        ical_data = cal.to_ical()
-        ical_data = ical_data.replace(b'\r\n ', b'').replace(b'\n ', b'')
-        
-        with open(filepath, 'wb') as f:
-            f.write(ical_data)
+
+        # Serializar componente a componente em vez do calendário inteiro:
+        # o cabeçalho vem de uma cópia só com as propriedades e, como cada
+        # VEVENT, é escrito já desdobrado
+        header = Calendar(cal).to_ical().replace(b'\r\n ', b'')[:-len(VCALENDAR_END)]
+
+        with atomic_write(filepath) as f:
+            f.write(header)
+            # to_ical() termina sempre as linhas em CRLF: um único replace
+            # desdobra as continuações
+            for component in cal.subcomponents:
+                f.write(component.to_ical().replace(b'\r\n ', b''))
+            f.write(VCALENDAR_END)
         
         filesize = os.path.getsize(filepath)
         log_success(f"Exported {filepath} ({filesize} bytes)")
@@ -703,12 +754,47 @@ def export_to_file(cal: Calendar, filepath: str) -> bool:
 # SYNC PRINCIPAL
 # ============================================================================
 
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+# Serializa sincronizações concorrentes: os endpoints da API correm em threads
+# do servidor e em vários workers gunicorn, e escrevem os mesmos ficheiros .ics.
+# O threading.Lock cobre as threads do processo; o flock sobre SYNC_LOCK_PATH
+# cobre os outros processos.
+SYNC_LOCK = threading.Lock()
+
+@contextmanager
+def file_lock(path: str):
+    """Lock exclusivo entre processos (flock sobre path); sem fcntl, não faz nada."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def sync_lock():
+    """Lock exclusivo do sync, entre threads e entre processos."""
+    with SYNC_LOCK, file_lock(SYNC_LOCK_PATH):
+        yield
+
 def sync_local(force_download: bool = False) -> Dict[str, Any]:
     """Main sync.
     
     Args:
         force_download: Se True, força download fresco de calendários externos
     """
+    with sync_lock():
+        return _sync_local_unlocked(force_download=force_download)
+
+def _sync_local_unlocked(force_download: bool = False) -> Dict[str, Any]:
+    """Corpo do sync; o chamador deve deter sync_lock()."""
     try:
         calendars = fetch_all_calendars(force_download=force_download)
         if calendars is None:
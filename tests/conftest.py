@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Configuração comum dos testes: raiz do repositório no sys.path e fixtures."""
+
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def write_ics(path: Path, events) -> None:
+    """Grava um .ics simples; events = [(uid, summary, dtstart, dtend, categoria)]."""
+    from icalendar import Calendar, Event
+
+    cal = Calendar()
+    cal.add('prodid', '-//Testes//PT')
+    cal.add('version', '2.0')
+    for uid, summary, dtstart, dtend, category in events:
+        event = Event()
+        event.add('uid', uid)
+        event.add('summary', summary)
+        event.add('dtstart', dtstart)
+        event.add('dtend', dtend)
+        event.add('categories', category)
+        cal.add_component(event)
+    path.write_bytes(cal.to_ical())
+
+
+@pytest.fixture
+def calendar_dir(tmp_path, monkeypatch):
+    """Diretório de trabalho com import/manual_calendar.ics (os endpoints usam caminhos relativos)."""
+    write_ics(tmp_path / 'import_calendar.ics', [
+        ('imp-1', 'Reserva A', date(2026, 3, 1), date(2026, 3, 5), 'RESERVATION'),
+        ('imp-2', 'Reserva B', date(2026, 4, 10), date(2026, 4, 12), 'RESERVATION'),
+        ('imp-3', 'Reserva C', datetime(2026, 5, 2, 15, tzinfo=timezone.utc),
+         datetime(2026, 5, 6, 11, tzinfo=timezone.utc), 'RESERVATION'),
+    ])
+    write_ics(tmp_path / 'manual_calendar.ics', [
+        ('man-1', 'Bloqueio', date(2026, 3, 20), date(2026, 3, 21), 'MANUAL-BLOCK'),
+    ])
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client(calendar_dir):
+    """Cliente de teste da app Flask, com sessão autenticada e cache de corpos vazia."""
+    import main
+
+    main._body_cache.clear()
+    main.app.config['TESTING'] = True
+    with main.app.test_client() as test_client:
+        with test_client.session_transaction() as sess:
+            sess['user'] = 'teste'
+        yield test_client
+    main._body_cache.clear()
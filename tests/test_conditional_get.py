@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""GET condicional (ETag/304) e cache de corpos serializados (conditional_get)."""
+
+import gzip
+import os
+from datetime import date
+
+from conftest import write_ics
+
+
+def test_matching_if_none_match_returns_304(client):
+    first = client.get('/api/events')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    again = client.get('/api/events', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+
+def test_cached_body_is_reused_while_files_are_unchanged(client):
+    first = client.get('/api/events')
+    second = client.get('/api/events')
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_rewriting_ics_invalidates_etag_and_cached_bodies(client, calendar_dir, monkeypatch):
+    import main
+
+    # Respostas pequenas: baixar o limiar para exercitar também a variante gzip
+    monkeypatch.setattr(main, 'GZIP_MIN_SIZE', 0)
+    first = client.get('/api/events')
+    first_gzip = client.get('/api/events', headers={'Accept-Encoding': 'gzip'})
+    assert first_gzip.headers.get('Content-Encoding') == 'gzip'
+    summaries = {event['summary'] for event in first.get_json()['data']}
+    assert 'Bloqueio novo' not in summaries
+
+    manual = calendar_dir / 'manual_calendar.ics'
+    stat = manual.stat()
+    write_ics(manual, [
+        ('man-1', 'Bloqueio', date(2026, 3, 20), date(2026, 3, 21), 'MANUAL-BLOCK'),
+        ('man-2', 'Bloqueio novo', date(2026, 6, 1), date(2026, 6, 3), 'MANUAL-BLOCK'),
+    ])
+    # Garantir mtime diferente mesmo em sistemas de ficheiros com pouca resolução
+    os.utime(manual, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    stale = client.get('/api/events', headers={'If-None-Match': first.headers['ETag']})
+    assert stale.status_code == 200
+    assert stale.headers['ETag'] != first.headers['ETag']
+    assert 'Bloqueio novo' in {event['summary'] for event in stale.get_json()['data']}
+
+    fresh_gzip = client.get('/api/events', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(fresh_gzip.data) == stale.data
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Parser rápido de VEVENT (_fast_parse_vevents) vs. caminho icalendar."""
+
+import pytest
+from icalendar import Calendar
+
+from backend.ics import _component_to_record, _fast_parse_vevents
+
+
+def _ics(value: str) -> str:
+    return (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//Teste//PT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "UID:evento-1\r\n"
+        f"SUMMARY:{value}\r\n"
+        f"DESCRIPTION:{value}\r\n"
+        "DTSTART;VALUE=DATE:20260101\r\n"
+        "DTEND;VALUE=DATE:20260103\r\n"
+        "CATEGORIES:RESERVATION\r\n"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+
+
+def _icalendar_records(text: str):
+    return [
+        _component_to_record(component)
+        for component in Calendar.from_ical(text).walk()
+        if component.name == "VEVENT"
+    ]
+
+
+# Separadores de linha Unicode que str.splitlines() reconhece mas que, num
+# ICS, são apenas conteúdo do valor
+@pytest.mark.parametrize("value", [
+    "x\u2028y:z",
+    "x\u2029y:z",
+    "x\x85y:z",
+    "x\x0by",
+    "x\x0cy",
+    "x\x1cy\x1dz\x1e",
+    "Hóspede simples",
+])
+def test_fast_parser_keeps_unicode_separators_in_values(value):
+    text = _ics(value)
+    fast = _fast_parse_vevents(text)
+
+    assert fast is not None
+    assert fast == _icalendar_records(text)
+    assert fast[0].summary == value
+    assert fast[0].description == value
+
+
+def test_fast_parser_matches_icalendar_with_folded_lines():
+    text = _ics("Reserva " + "muito longa " * 10).replace("Reserva ", "Reserva\r\n ", 1)
+
+    assert _fast_parse_vevents(text) == _icalendar_records(text)
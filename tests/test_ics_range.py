@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""read_ics_range (índice por data / scan de blocos) vs. filtro linear."""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from backend.ics import ICSHandler
+from conftest import write_ics
+
+
+def _random_events(seed: int, count: int = 120):
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        start = date(2026, 1, 1) + timedelta(days=rng.randint(-60, 420))
+        end = start + timedelta(days=rng.randint(0, 25))
+        if rng.random() < 0.3:
+            start = datetime(start.year, start.month, start.day, rng.randint(0, 23), tzinfo=timezone.utc)
+            end = datetime(end.year, end.month, end.day, rng.randint(0, 23), tzinfo=timezone.utc)
+        events.append((f'ev-{i}', f'Evento {i}', start, end, 'RESERVATION'))
+    return events
+
+
+def _linear_overlap(events, start: str, end: str):
+    """Eventos com dtstart <= end e dtend (exclusivo) > start, por dia."""
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    return [
+        event for event in events
+        if event['dtstart'] and event['dtend']
+        and date.fromisoformat(event['dtstart'][:10]) <= last
+        and date.fromisoformat(event['dtend'][:10]) > first
+    ]
+
+
+def _uids(events):
+    return sorted(event['uid'] for event in events)
+
+
+RANGES = [
+    ('2026-01-01', '2026-01-31'),
+    ('2026-03-15', '2026-03-15'),
+    ('2025-10-01', '2027-06-30'),
+    ('2027-12-01', '2027-12-31'),
+    ('2026-06-01', '2026-08-31'),
+]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_range_matches_linear_filter_cold_and_cached(tmp_path, seed):
+    path = tmp_path / f'calendar_{seed}.ics'
+    write_ics(path, _random_events(seed))
+
+    # Sem cache: scan dos blocos em bruto
+    cold = {bounds: ICSHandler.read_ics_range(str(path), *bounds) for bounds in RANGES}
+
+    # Com cache: índice por data de início construído sobre read_ics_file()
+    all_events = ICSHandler.read_ics_file(str(path))
+    assert all_events
+
+    for bounds in RANGES:
+        expected = _linear_overlap(all_events, *bounds)
+        assert _uids(cold[bounds] or []) == _uids(expected)
+        cached = ICSHandler.read_ics_range(str(path), *bounds)
+        assert sorted(cached, key=lambda event: event['uid']) == sorted(expected, key=lambda event: event['uid'])
+
+
+def test_get_events_in_range_matches_linear_filter():
+    events = [
+        {'uid': 'a', 'dtstart': '2026-03-01', 'dtend': '2026-03-05'},
+        {'uid': 'b', 'dtstart': '2026-03-05', 'dtend': '2026-03-06'},
+        {'uid': 'c', 'dtstart': '2026-02-01', 'dtend': '2026-03-01'},
+        {'uid': 'd', 'dtstart': '2026-02-20T14:00:00+00:00', 'dtend': '2026-03-02T10:00:00+00:00'},
+        {'uid': 'e', 'dtstart': '2026-03-01', 'dtend': ''},
+    ]
+    result = ICSHandler.get_events_in_range(events, '2026-03-01', '2026-03-05')
+
+    assert _uids(result) == _uids(_linear_overlap(events, '2026-03-01', '2026-03-05'))
+    assert all(event is not original for event in result for original in events)
+
+
+@pytest.mark.parametrize('query', [
+    '?start=2026-03-01',
+    '?end=2026-03-31',
+    '?start=foo&end=bar',
+    '?start=2026-04-01&end=2026-03-01',
+])
+def test_events_api_rejects_invalid_range(client, query):
+    response = client.get('/api/events' + query)
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_events_api_range_matches_linear_filter(client):
+    response = client.get('/api/events?start=2026-03-04&end=2026-04-10')
+
+    assert response.status_code == 200
+    summaries = sorted(event['summary'] for event in response.get_json()['data'])
+    assert summaries == ['Bloqueio', 'Reserva A', 'Reserva B']
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""export_to_file: saída igual à do calendário inteiro desdobrado."""
+
+from datetime import date
+
+from icalendar import Calendar, Event
+
+from sync import export_to_file
+
+
+def test_export_unfolds_long_header_and_event_lines(tmp_path):
+    cal = Calendar()
+    cal.add('prodid', '-//Rental Calendar Sync//PT//' + 'Plataforma OTA ' * 8)
+    cal.add('version', '2.0')
+    cal.add('x-wr-calname', 'Calendário de reservas ' * 6)
+    cal.add('x-wr-caldesc', 'Descrição muito longa do calendário importado ' * 4)
+    event = Event()
+    event.add('uid', 'reserva-1')
+    event.add('summary', 'Reserva com um nome de hóspede bastante comprido ' * 3)
+    event.add('dtstart', date(2026, 3, 1))
+    event.add('dtend', date(2026, 3, 5))
+    cal.add_component(event)
+
+    target = tmp_path / 'master_calendar.ics'
+    assert export_to_file(cal, str(target))
+
+    expected = cal.to_ical().replace(b'\r\n ', b'').replace(b'\n ', b'')
+    assert target.read_bytes() == expected
+    assert list(tmp_path.iterdir()) == [target]